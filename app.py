@@ -5,27 +5,103 @@ load_dotenv() ## load all the environment variables
 
 import streamlit as st
 import os
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
 import google.generativeai as genai
-from PIL import Image
-
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-
-## Function to load Google Gemini Pro Vision API And get response
-
-def get_gemini_response(input,image,prompt):
-    model=genai.GenerativeModel('gemini-pro-vision')
-    response=model.generate_content([input,image[0],prompt])
-    return response.text
-
-def input_image_setup(uploaded_file):
+from PIL import Image, ImageOps
+
+## Configure the Gemini client once per process; gRPC is already the SDK's
+## default transport and is pinned here so it isn't swapped out silently
+
+@st.cache_resource(show_spinner=False)
+def _configure_genai():
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"), transport="grpc")
+
+_configure_genai()
+
+## Build the Gemini model once and reuse it across reruns and sessions
+
+@st.cache_resource
+def _get_model(name="gemini-pro-vision"):
+    return genai.GenerativeModel(name)
+
+## Completed responses are shared across sessions in a bounded LRU map with a
+## TTL, keyed on the prompts and the original upload, so resubmitting
+## unchanged inputs skips both image preprocessing and the API round trip
+
+RESPONSE_CACHE_SIZE = 128
+RESPONSE_CACHE_TTL = 3600
+
+@st.cache_resource(show_spinner=False)
+def _response_cache():
+    return OrderedDict(), threading.Lock()
+
+def _get_cached_response(key):
+    cache, lock = _response_cache()
+    with lock:
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        text, stored_at = entry
+        if time.monotonic() - stored_at > RESPONSE_CACHE_TTL:
+            del cache[key]
+            return None
+        cache.move_to_end(key)
+        return text
+
+def _put_cached_response(key, text):
+    cache, lock = _response_cache()
+    with lock:
+        cache[key] = (text, time.monotonic())
+        cache.move_to_end(key)
+        while len(cache) > RESPONSE_CACHE_SIZE:
+            cache.popitem(last=False)
+
+## Function to load Google Gemini Pro Vision API And stream the response
+
+def get_gemini_response(input,bytes_data,mime_type,prompt):
+    if bytes_data is None:
+        raise FileNotFoundError("No file uploaded")
+    key=(input,mime_type,hashlib.blake2b(bytes_data,digest_size=16).digest(),prompt)
+    response=_get_cached_response(key)
+    if response is not None:
+        yield response
+        return
+    image=input_image_setup(bytes_data)
+    chunks=[]
+    for chunk in _get_model().generate_content([input,image[0],prompt],stream=True):
+        chunks.append(chunk.text)
+        yield chunk.text
+    _put_cached_response(key,"".join(chunks))
+
+def input_image_setup(bytes_data):
     # Check if a file has been uploaded
-    if uploaded_file is not None:
-        # Read the file into bytes
-        bytes_data = uploaded_file.getvalue()
+    if bytes_data is not None:
+        img = Image.open(BytesIO(bytes_data))
+
+        # Small, upright JPEGs are sent as-is; anything else is downscaled to
+        # at most 1024x1024 and re-encoded as JPEG to cut upload size
+        orientation = img.getexif().get(0x0112, 1)
+        if img.format != "JPEG" or max(img.size) > 1024 or orientation != 1:
+            # Re-encoding drops EXIF, so apply the orientation tag to the pixels
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((1024, 1024))
+            # JPEG has no alpha channel; composite transparent areas onto white
+            if img.mode in ("RGBA", "LA") or "transparency" in img.info:
+                img = img.convert("RGBA")
+                background = Image.new("RGB", img.size, "white")
+                background.paste(img, mask=img.getchannel("A"))
+                img = background
+            buf = BytesIO()
+            img.convert("RGB").save(buf, format="JPEG", quality=85)
+            bytes_data = buf.getvalue()
 
         image_parts = [
             {
-                "mime_type": uploaded_file.type,  # Get the mime type of the uploaded file
+                "mime_type": "image/jpeg",
                 "data": bytes_data
             }
         ]
@@ -38,15 +114,22 @@ def input_image_setup(uploaded_file):
 st.set_page_config(page_title="Gemini Health App")
 
 st.header("Gemini Health App")
-input=st.text_input("Input Prompt: ",key="input")
 uploaded_file = st.file_uploader("Choose an image...", type=["jpg", "jpeg", "png"])
 image=""   
+bytes_data=None
+mime_type=None
 if uploaded_file is not None:
-    image = Image.open(uploaded_file)
+    # Read the file into bytes once for both the preview and the API call
+    bytes_data = uploaded_file.getvalue()
+    mime_type = uploaded_file.type
+    image = Image.open(BytesIO(bytes_data))
     st.image(image, caption="Uploaded Image.", use_column_width=True)
 
+## Batch the prompt and submit into a form so typing doesn't trigger a rerun
 
-submit=st.button("Tell me the total calories")
+with st.form("calories"):
+    input=st.text_input("Input Prompt: ",key="input")
+    submit=st.form_submit_button("Tell me the total calories")
 
 input_prompt="""
 You are an expert in nutritionist where you need to see the food items from the image
@@ -64,8 +147,6 @@ You are an expert in nutritionist where you need to see the food items from the
 ## If submit button is clicked
 
 if submit:
-    image_data=input_image_setup(uploaded_file)
-    response=get_gemini_response(input_prompt,image_data,input)
     st.subheader("The Response is")
-    st.write(response)
+    st.write_stream(get_gemini_response(input_prompt,bytes_data,mime_type,input))
 